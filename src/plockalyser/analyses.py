@@ -1,57 +1,298 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property
+import heapq
+import logging
+import os
+import random
 from typing import Iterable, Optional
 import networkx as nx
-from networkx import find_cycle
 import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
 
-from plockalyser.markdown import generate_markdown_table, table_margin_marker
+try:
+    import igraph
+except ImportError:  # Optional, install with the `igraph` extra
+    igraph = None
+
+from plockalyser.markdown import MARGIN_MARKERS, generate_markdown_table
+
+logger = logging.getLogger(__name__)
 
 TOP_X_TO_SHOW = 20
 BOTTOM_X_TO_SHOW = 10
+BETWEENNESS_SAMPLE_SIZE = 256
+# Distance matrix entries per chunk of source nodes in calculate_closeness,
+# about 128 MB of float64.
+CLOSENESS_CHUNK_ELEMENTS = 2**24
+# Above this many nodes, path lengths are approximated instead of running an
+# all-pairs BFS over the largest component.
+EXACT_PATH_LENGTH_MAX_NODES = 5000
+PATH_LENGTH_SAMPLE_SIZE = 256
+
+
+def _highest(items: Iterable[tuple[str, float]], n: int) -> list[tuple[str, float]]:
+    """The `n` items with the highest scores, highest first."""
+    return heapq.nlargest(n, items, key=lambda x: x[1])
+
+
+def _lowest(items: Iterable[tuple[str, float]], n: int) -> list[tuple[str, float]]:
+    """The `n` items with the lowest scores, highest first.
+
+    Ties come out in the same order as in the tail of a stable descending sort,
+    which the bottom tables rely on since many scores tie. Getting that order means
+    copying the full list to reverse it.
+    """
+    return heapq.nsmallest(n, reversed(list(items)), key=lambda x: x[1])[::-1]
+
+
+@dataclass
+class GraphViews:
+    """Derived graphs that several analyses need, built at most once per run."""
+
+    directed: nx.DiGraph
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph) -> "GraphViews":
+        return cls(directed=graph)
+
+    @cached_property
+    def undirected(self) -> nx.Graph:
+        return self.directed.to_undirected()
+
+
+@dataclass
+class GraphMetrics:
+    """Degree and centrality metrics shared between the analyses.
+
+    Each metric is computed on first access and then reused for the rest of the run.
+    """
 
+    views: GraphViews
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph) -> "GraphMetrics":
+        return cls(views=GraphViews.from_graph(graph))
+
+    # Read the adjacency dicts directly rather than going through the degree views
+    @cached_property
+    def in_degrees(self) -> dict[str, int]:
+        pred = self.views.directed._pred
+        return {node: len(pred[node]) for node in pred}
+
+    @cached_property
+    def out_degrees(self) -> dict[str, int]:
+        succ = self.views.directed._succ
+        return {node: len(succ[node]) for node in succ}
+
+    @cached_property
+    def degrees(self) -> dict[str, int]:
+        out_degrees = self.out_degrees
+        return {node: d + out_degrees[node] for node, d in self.in_degrees.items()}
+
+    # Betweenness and PageRank use igraph's C implementations when igraph is
+    # installed, scaled to match the NetworkX results. Closeness always uses
+    # calculate_closeness: igraph would need a second all-pairs pass to count
+    # the reachable nodes for the Wasserman-Faust scaling, which made it slower.
+    @cached_property
+    def igraph_graph(self) -> "igraph.Graph":
+        assert igraph is not None
+        nodes = list(self.views.directed)
+        index = {node: i for i, node in enumerate(nodes)}
+        return igraph.Graph(
+            n=len(nodes),
+            edges=[(index[u], index[v]) for u, v in self.views.directed.edges()],
+            directed=True,
+            vertex_attrs={"name": nodes},
+        )
+
+    def _igraph_betweenness(self, directed: bool) -> dict[str, float]:
+        graph = self.igraph_graph if directed else self.igraph_graph.as_undirected()
+        nodes = graph.vs["name"]
+        n = len(nodes)
+        sources = _betweenness_sources(nodes, self.betweenness_sample_size, seed=0)
+        index = {node: i for i, node in enumerate(nodes)}
+        betweenness = graph.betweenness(
+            directed=directed, sources=[index[node] for node in sources]
+        )
+        if n <= 2:
+            return dict(zip(nodes, betweenness))
+        # igraph counts undirected paths once, NetworkX once in each direction
+        scale = (1 if directed else 2) / ((n - 1) * (n - 2)) * n / len(sources)
+        return {node: b * scale for node, b in zip(nodes, betweenness)}
+
+    @cached_property
+    def closeness_in_out(self) -> tuple[dict[str, float], dict[str, float]]:
+        # Both directions from the same shortest path distances
+        return calculate_closeness(self.views.directed)
+
+    @cached_property
+    def closeness_in(self) -> dict[str, float]:
+        return self.closeness_in_out[0]
+
+    @cached_property
+    def closeness_out(self) -> dict[str, float]:
+        return self.closeness_in_out[1]
+
+    @cached_property
+    def betweenness_sample_size(self) -> int:
+        # Exact betweenness is O(V*E); sample the source nodes on large graphs.
+        # The top of the ranking is stable enough for the tables.
+        return min(self.views.directed.number_of_nodes(), BETWEENNESS_SAMPLE_SIZE)
+
+    @cached_property
+    def betweenness_directed_undirected(
+        self,
+    ) -> tuple[dict[str, float], dict[str, float]]:
+        if igraph is not None:
+            return (
+                self._igraph_betweenness(directed=True),
+                self._igraph_betweenness(directed=False),
+            )
+        # Both graphs in one process pool, so that all the workers are kept busy
+        directed, undirected = parallel_betweenness_centralities(
+            [self.views.directed, self.views.undirected],
+            k=self.betweenness_sample_size,
+            seed=0,
+        )
+        return directed, undirected
+
+    @property
+    def betweenness_directed(self) -> dict[str, float]:
+        return self.betweenness_directed_undirected[0]
 
-def analyse_connectivity(graph: nx.DiGraph) -> str:
+    @property
+    def betweenness_undirected(self) -> dict[str, float]:
+        return self.betweenness_directed_undirected[1]
+
+    @cached_property
+    def pagerank(self) -> dict[str, float]:
+        if igraph is not None:
+            return dict(zip(self.igraph_graph.vs["name"], self.igraph_graph.pagerank()))
+        return calculate_pagerank(self.views.directed)
+
+
+def calculate_closeness(
+    graph: nx.DiGraph, max_chunk_elements: int = CLOSENESS_CHUNK_ELEMENTS
+) -> tuple[dict[str, float], dict[str, float]]:
+    """Calculate closeness centrality for incoming and outgoing paths.
+
+    Gives the same results as `nx.closeness_centrality(graph)` and
+    `nx.closeness_centrality(graph.reverse())`, but from a single all-pairs BFS in
+    SciPy. The distances are computed a chunk of source nodes at a time, with at
+    most `max_chunk_elements` entries in each chunk's distance matrix, to keep the
+    memory use bounded on large graphs.
+    """
+    nodes = list(graph)
+    n = len(nodes)
+    if n == 0:
+        return {}, {}
+    chunk_size = max(1, max_chunk_elements // n)
+    adjacency = nx.to_scipy_sparse_array(graph, nodelist=nodes, format="csr")
+
+    # Number of other nodes reachable along the paths, and the total path length
+    reachable_in = np.zeros(n)
+    reachable_out = np.zeros(n)
+    total_in = np.zeros(n)
+    total_out = np.zeros(n)
+    for start in range(0, n, chunk_size):
+        indices = np.arange(start, min(start + chunk_size, n))
+        # distances[i, v] is the distance from node indices[i] to node v
+        distances = csgraph.shortest_path(
+            adjacency, directed=True, unweighted=True, indices=indices
+        )
+        finite = np.isfinite(distances)
+        distances[~finite] = 0
+        reachable_in += finite.sum(axis=0)
+        total_in += distances.sum(axis=0)
+        reachable_out[indices] = finite.sum(axis=1)
+        total_out[indices] = distances.sum(axis=1)
+
+    def closeness(reachable: np.ndarray, total: np.ndarray) -> dict[str, float]:
+        # Don't count the node itself; scaled by the reachable fraction of the
+        # graph as in NetworkX (Wasserman and Faust).
+        reachable = reachable - 1
+        scores = np.divide(
+            reachable**2,
+            (n - 1) * total,
+            out=np.zeros(n),
+            where=(total > 0) & (n > 1),
+        )
+        return dict(zip(nodes, scores.tolist()))
+
+    return closeness(reachable_in, total_in), closeness(reachable_out, total_out)
+
+
+def calculate_pagerank(
+    graph: nx.DiGraph, alpha: float = 0.85, max_iter: int = 100, tol: float = 1.0e-6
+) -> dict[str, float]:
+    """Calculate PageRank with a power iteration on a sparse adjacency matrix.
+
+    Same model and convergence criterion as `nx.pagerank` with the default
+    arguments: uniform teleportation and dangling nodes linking to all nodes.
+    """
+    nodes = list(graph)
+    n = len(nodes)
+    if n == 0:
+        return {}
+
+    adjacency = nx.to_scipy_sparse_array(
+        graph, nodelist=nodes, weight=None, dtype=float
+    )
+    out_degree = adjacency.sum(axis=1)
+    dangling = out_degree == 0
+    inverse_out_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    # Transposed, row-normalised adjacency so that each step is a single SpMV
+    transition = (sparse.diags_array(inverse_out_degree) @ adjacency).T.tocsr()
+
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_last = x
+        x = alpha * (transition @ x + x[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(x - x_last).sum() < n * tol:
+            return dict(zip(nodes, x.tolist()))
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def analyse_connectivity(
+    graph: nx.DiGraph, metrics: Optional[GraphMetrics] = None
+) -> str:
     """Analyse the degree of connectivity in the network."""
-    assert callable(graph.degree)
-    degrees = dict(graph.degree())
-    in_degrees = dict(graph.in_degree())
-    out_degrees = dict(graph.out_degree())
+    metrics = metrics or GraphMetrics.from_graph(graph)
+    in_degrees = metrics.in_degrees
+    out_degrees = metrics.out_degrees
+    degrees = metrics.degrees
 
-    # Sort by total degree
-    sorted_degrees = sorted(degrees.items(), key=lambda x: x[1], reverse=True)
+    # Highest total degree first
+    top_degrees = _highest(degrees.items(), TOP_X_TO_SHOW)
 
-    output: list[str] = []
     marker = "degree_of_connectivity"
-    output.append(f"\n<!-- BEGIN {marker} -->")
-
-    output.append(f"table: Degree of connectivity per package {{#tbl:{marker}}}\n")
-    output.append("| Package | In | Out | Tot. |")
-    # First column really wide to make the table full-width with Pandoc/LaTeX.
-    output.append(
+    rows = "".join(
+        f"\n| {MARGIN_MARKERS.get(i, '')}`{pkg}` | {in_degrees[pkg]} | {out_degrees[pkg]} | {degree} |"
+        for i, (pkg, degree) in enumerate(top_degrees, 1)
+    )
+    return (
+        f"\n<!-- BEGIN {marker} -->\n"
+        f"table: Degree of connectivity per package {{#tbl:{marker}}}\n\n"
+        "| Package | In | Out | Tot. |\n"
+        # First column really wide to make the table full-width with Pandoc/LaTeX.
         "|--------------------------------------------------------------------|-----:|-----:|-----:|"
+        f"{rows}\n"
+        f"\n<!-- END {marker} -->"
     )
-    for i, (pkg, degree) in enumerate(sorted_degrees[:TOP_X_TO_SHOW], 1):
-        output.append(
-            f"| {table_margin_marker(i)}`{pkg}` | {in_degrees[pkg]} | {out_degrees[pkg]} | {degree} |"
-        )
-    output.append(f"\n<!-- END {marker} -->")
-    return "\n".join(output)
 
 
-def analyse_closeness(graph: nx.DiGraph) -> str:
-    closeness_in = nx.closeness_centrality(graph)
-    # reverse to get the out links (the dependencies)
-    closeness_out = nx.closeness_centrality(graph.reverse())
-    sorted_closeness_in = sorted(closeness_in.items(), key=lambda x: x[1], reverse=True)
-    sorted_closeness_out = sorted(
-        closeness_out.items(), key=lambda x: x[1], reverse=True
-    )
+def analyse_closeness(metrics: GraphMetrics) -> str:
+    closeness_in = metrics.closeness_in
+    closeness_out = metrics.closeness_out
 
     output: list[str] = []
     output.append(
         generate_markdown_table(
             "closeness_centrality_in",
-            sorted_closeness_in[:TOP_X_TO_SHOW],
+            _highest(closeness_in.items(), TOP_X_TO_SHOW),
             "Closeness centrality -- dependents, highest",
         )
     )
@@ -59,7 +300,7 @@ def analyse_closeness(graph: nx.DiGraph) -> str:
     output.append(
         generate_markdown_table(
             "closeness_centrality_in_lowest",
-            sorted_closeness_in[-BOTTOM_X_TO_SHOW:],
+            _lowest(closeness_in.items(), BOTTOM_X_TO_SHOW),
             "Closeness centrality -- dependents, lowest",
         )
     )
@@ -67,7 +308,7 @@ def analyse_closeness(graph: nx.DiGraph) -> str:
     output.append(
         generate_markdown_table(
             "closeness_centrality_out",
-            sorted_closeness_out[:TOP_X_TO_SHOW],
+            _highest(closeness_out.items(), TOP_X_TO_SHOW),
             "Closeness centrality -- dependencies, highest",
         )
     )
@@ -75,7 +316,9 @@ def analyse_closeness(graph: nx.DiGraph) -> str:
     output.append(
         generate_markdown_table(
             "closeness_centrality_out_lowest",
-            [(p, s) for p, s in sorted_closeness_out if s > 0][-BOTTOM_X_TO_SHOW:],
+            _lowest(
+                ((p, s) for p, s in closeness_out.items() if s > 0), BOTTOM_X_TO_SHOW
+            ),
             "Closeness centrality -- dependencies, lowest non-zero",
         )
     )
@@ -83,14 +326,89 @@ def analyse_closeness(graph: nx.DiGraph) -> str:
     return "\n".join(output)
 
 
-def analyse_betweenness(graph: nx.DiGraph) -> str:
-    betweenness_directed = nx.betweenness_centrality(graph)
-    betweenness_undirected = nx.betweenness_centrality(graph.to_undirected())
-    sorted_betweenness_directed = sorted(
-        betweenness_directed.items(), key=lambda x: x[1], reverse=True
+_worker_graphs: list[nx.Graph] = []
+
+
+def _init_betweenness_worker(graphs: list[nx.Graph]):
+    global _worker_graphs
+    _worker_graphs = graphs
+
+
+def _betweenness_for_sources(graph_index: int, sources: list[str]) -> dict[str, float]:
+    graph = _worker_graphs[graph_index]
+    return nx.betweenness_centrality_subset(
+        graph, sources, list(graph), normalized=True
     )
-    sorted_betweenness_undirected = sorted(
-        betweenness_undirected.items(), key=lambda x: x[1], reverse=True
+
+
+def _betweenness_sources(
+    nodes: list[str], k: Optional[int], seed: Optional[int]
+) -> list[str]:
+    """All nodes, or `k` of them sampled at random if `k` is smaller."""
+    if k is not None and k < len(nodes):
+        return random.Random(seed).sample(nodes, k)
+    return nodes
+
+
+def parallel_betweenness_centralities(
+    graphs: list[nx.Graph],
+    k: Optional[int] = None,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> list[dict[str, float]]:
+    """Calculate betweenness centrality for each graph, with the source nodes of all
+    the graphs split across one shared pool of processes.
+
+    With `k` unset this gives the same result as `nx.betweenness_centrality(graph)`.
+    Otherwise only `k` randomly sampled source nodes are used and the result is
+    scaled up to estimate the exact value. Adapted from the parallel betweenness
+    example in the NetworkX gallery.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    all_nodes = [list(graph) for graph in graphs]
+    all_sources = [_betweenness_sources(nodes, k, seed) for nodes in all_nodes]
+
+    if max_workers <= 1 or sum(len(sources) for sources in all_sources) < 2:
+        results = [
+            nx.betweenness_centrality_subset(graph, sources, nodes, normalized=True)
+            for graph, nodes, sources in zip(graphs, all_nodes, all_sources)
+        ]
+    else:
+        # A few chunks per worker and graph to even out the load
+        jobs: list[tuple[int, list[str]]] = []
+        for graph_index, sources in enumerate(all_sources):
+            num_chunks = min(len(sources), max_workers * 4)
+            jobs.extend(
+                (graph_index, sources[i::num_chunks]) for i in range(num_chunks)
+            )
+
+        results = [dict.fromkeys(nodes, 0.0) for nodes in all_nodes]
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_betweenness_worker,
+            initargs=(graphs,),
+        ) as executor:
+            partials = executor.map(_betweenness_for_sources, *zip(*jobs))
+            for (graph_index, _), partial in zip(jobs, partials):
+                betweenness = results[graph_index]
+                for node, score in partial.items():
+                    betweenness[node] += score
+
+    for i, (nodes, sources) in enumerate(zip(all_nodes, all_sources)):
+        if len(sources) < len(nodes):
+            scale = len(nodes) / len(sources)
+            results[i] = {node: score * scale for node, score in results[i].items()}
+    return results
+
+
+def analyse_betweenness(metrics: GraphMetrics) -> str:
+    betweenness_directed = metrics.betweenness_directed
+    betweenness_undirected = metrics.betweenness_undirected
+    k = metrics.betweenness_sample_size
+    approximate = (
+        f" (approximate, {k} sampled sources)"
+        if k < metrics.views.directed.number_of_nodes()
+        else ""
     )
 
     output: list[str] = []
@@ -98,42 +416,44 @@ def analyse_betweenness(graph: nx.DiGraph) -> str:
     output.append(
         generate_markdown_table(
             "betweenness_centrality_directed",
-            sorted_betweenness_directed[:TOP_X_TO_SHOW],
-            "Betweenness centrality -- directed",
+            _highest(betweenness_directed.items(), TOP_X_TO_SHOW),
+            f"Betweenness centrality -- directed{approximate}",
         )
     )
 
     output.append(
         generate_markdown_table(
             "betweenness_centrality_undirected",
-            sorted_betweenness_undirected[:TOP_X_TO_SHOW],
-            "Betweenness centrality -- undirected",
+            _highest(betweenness_undirected.items(), TOP_X_TO_SHOW),
+            f"Betweenness centrality -- undirected{approximate}",
         )
     )
 
     return "\n".join(output)
 
 
-def analyse_pagerank(graph: nx.DiGraph) -> str:
-    pagerank = nx.pagerank(graph)  # PageRank as a prestige metric
-    sorted_pagerank = sorted(pagerank.items(), key=lambda x: x[1], reverse=True)
+def analyse_pagerank(metrics: GraphMetrics) -> str:
+    pagerank = metrics.pagerank  # PageRank as a prestige metric
 
     output: list[str] = []
     output.append(
         generate_markdown_table(
             "pagerank_centrality",
-            sorted_pagerank[:TOP_X_TO_SHOW],
+            _highest(pagerank.items(), TOP_X_TO_SHOW),
             "Prestige centrality (PageRank algorithm)",
         )
     )
     return "\n".join(output)
 
 
-def analyse_centrality(graph: nx.DiGraph) -> str:
+def analyse_centrality(
+    graph: nx.DiGraph, metrics: Optional[GraphMetrics] = None
+) -> str:
+    metrics = metrics or GraphMetrics.from_graph(graph)
     output: list[str] = []
-    output.append(analyse_closeness(graph))
-    output.append(analyse_betweenness(graph))
-    output.append(analyse_pagerank(graph))
+    output.append(analyse_closeness(metrics))
+    output.append(analyse_betweenness(metrics))
+    output.append(analyse_pagerank(metrics))
     return "\n\n".join(output)
 
 
@@ -149,29 +469,48 @@ class DependencyNetworkStats:
     clustering: float
     density: float
     packages_with_more_than_one_version: int
+    path_lengths_approximate: bool = False
+
+
+def _pseudo_diameter(adjacency: sparse.csr_array) -> int:
+    """Lower bound on the diameter of a connected graph from a double-sweep BFS.
+
+    BFS from an arbitrary node to the farthest node, then BFS from there and take
+    the largest distance.
+    """
+    distances = csgraph.shortest_path(
+        adjacency, directed=False, unweighted=True, indices=0
+    )
+    farthest = int(np.argmax(distances))
+    distances = csgraph.shortest_path(
+        adjacency, directed=False, unweighted=True, indices=farthest
+    )
+    return int(distances.max())
 
 
-def get_summary_statistics(graph: nx.DiGraph) -> DependencyNetworkStats:
+def get_summary_statistics(
+    graph: nx.DiGraph, metrics: Optional[GraphMetrics] = None
+) -> DependencyNetworkStats:
     """Get summary statistics about the dependency network."""
+    metrics = metrics or GraphMetrics.from_graph(graph)
+
     # Basic stats
     nodes = graph.number_of_nodes()
     edges = graph.number_of_edges()
 
     # Find which packages that have more than one version:
-    version_count: dict[str, int] = {}
-    for node, nodedata in graph.nodes.items():
-        if nodedata["name"] in version_count:
-            version_count[nodedata["name"]] += 1
-        else:
-            version_count[nodedata["name"]] = 1
-    more_than_one_version = {k: v for k, v in version_count.items() if v > 1}
-
-    # Find loops. Just print them out for now.
-    loops = find_cycle(graph)
-    print(f"{loops=}")
+    version_count = Counter(nodedata["name"] for _, nodedata in graph.nodes(data=True))
+    more_than_one_version = sum(1 for v in version_count.values() if v > 1)
+
+    # Find loops. Just log them for now, and skip the DFS unless it will be shown.
+    if logger.isEnabledFor(logging.DEBUG):
+        try:
+            logger.debug("loops=%s", nx.find_cycle(graph))
+        except nx.NetworkXNoCycle:
+            pass
 
     # Find the root node (should have in_degree of 0)
-    root_nodes = [node for node in graph.nodes() if graph.in_degree(node) == 0]
+    root_nodes = [node for node, d in metrics.in_degrees.items() if d == 0]
     assert len(root_nodes) == 1
     root_node = root_nodes[0]  # Assume the first root node is the main one
     # Count direct dependencies (distance 1 from root)
@@ -179,14 +518,33 @@ def get_summary_statistics(graph: nx.DiGraph) -> DependencyNetworkStats:
     direct_dependencies = len(direct_deps)
 
     # Connected components in the undirected graph
-    undirected = graph.to_undirected()
+    undirected = metrics.views.undirected
     connected_components = list(nx.connected_components(undirected))
 
     # Average path length (only for the largest component to avoid errors)
     largest_cc = max(connected_components, key=len)
     largest_subgraph = undirected.subgraph(largest_cc)
-    max_path_length = nx.diameter(largest_subgraph)
-    avg_path_length = nx.average_shortest_path_length(largest_subgraph)
+    adjacency = nx.to_scipy_sparse_array(largest_subgraph, format="csr")
+    n = largest_subgraph.number_of_nodes()
+    path_lengths_approximate = n > EXACT_PATH_LENGTH_MAX_NODES
+    if path_lengths_approximate:
+        # All-pairs BFS is O(V*(V+E)); use the pseudo-diameter and the average
+        # over paths from a sample of source nodes.
+        max_path_length = _pseudo_diameter(adjacency)
+        sources = random.Random(0).sample(range(n), PATH_LENGTH_SAMPLE_SIZE)
+        distances = csgraph.shortest_path(
+            adjacency, directed=False, unweighted=True, indices=sources
+        )
+        avg_path_length = float(distances.sum() / (len(sources) * (n - 1)))
+    else:
+        # One all-pairs BFS pass (in SciPy) gives both the diameter and the
+        # average length.
+        distances = csgraph.shortest_path(
+            adjacency, directed=False, unweighted=True, return_predecessors=False
+        )
+        path_lengths = distances[np.isfinite(distances)]
+        max_path_length = int(path_lengths.max())
+        avg_path_length = float(path_lengths.sum() / (n * (n - 1))) if n > 1 else 0.0
 
     # Clustering coefficient
     clustering = nx.average_clustering(undirected)
@@ -202,7 +560,8 @@ def get_summary_statistics(graph: nx.DiGraph) -> DependencyNetworkStats:
         avg_path_length=avg_path_length,
         clustering=clustering,
         density=density,
-        packages_with_more_than_one_version=len(more_than_one_version),
+        packages_with_more_than_one_version=more_than_one_version,
+        path_lengths_approximate=path_lengths_approximate,
     )
 
 
@@ -228,7 +587,12 @@ def format_summary_statistics(stats: DependencyNetworkStats) -> str:
         output.append(
             "| Number of direct dependencies of `root` | Warning: No `root` node found |"
         )
-    output.append(f"| Maximum path length | {stats.max_path_length} |")
+    if stats.path_lengths_approximate:
+        output.append(
+            f"| Maximum path length (approximate, pseudo-diameter) | {stats.max_path_length} |"
+        )
+    else:
+        output.append(f"| Maximum path length | {stats.max_path_length} |")
     output.append(
         f"| Packages with more than one version | {stats.packages_with_more_than_one_version} |"
     )
@@ -242,58 +606,49 @@ def calculate_gini_coefficients(data: Iterable[float]) -> float:
     The Gini coefficient measures inequality in a distribution.
     A value of 0 represents perfect equality, while 1 represents maximum inequality.
     """
-    values = sorted(data)
-    n = len(values)
+    x = np.sort(np.fromiter(data, dtype=np.float64))
+    n = x.size
 
     # If there are no values or only one value, return 0 (perfect equality)
     if n <= 1:
         return 0.0
 
-    # Slightly adapted from https://stackoverflow.com/a/61154922
-
-    x = np.array(data)
-    diffsum: float = 0
-    for i, xi in enumerate(x[:-1], 1):
-        diffsum += np.sum(np.abs(xi - x[i:]))
-
-    return diffsum / (len(x) ** 2 * np.mean(x, dtype=np.float64))
+    # Closed form over the sorted values, equivalent to the mean absolute
+    # difference formulation but without the O(n^2) pairwise loop.
+    index = np.arange(1, n + 1)
+    return float(2 * np.dot(index, x) / (n * x.sum()) - (n + 1) / n)
 
 
-def format_gini(graph: nx.DiGraph) -> str:
+def format_gini(graph: nx.DiGraph, metrics: Optional[GraphMetrics] = None) -> str:
     """Print Gini coefficients for some of the graph's measures."""
+    metrics = metrics or GraphMetrics.from_graph(graph)
 
     data: list[tuple[str, float]] = []
 
     # Closeness (dependencies)
-    closeness_out = nx.closeness_centrality(graph.reverse())
-    gini_closeness_out = calculate_gini_coefficients(
-        [v for v in closeness_out.values()]
-    )
+    closeness_out = metrics.closeness_out
+    gini_closeness_out = calculate_gini_coefficients(closeness_out.values())
     data.append(("Closeness (dependencies)", gini_closeness_out))
 
     # Degree of connectivity (out-degree/dependencies)
-    out_degree = graph.out_degree()
-    assert type(out_degree) is not int
-    gini_out_degree = calculate_gini_coefficients([v for _, v in out_degree])
+    gini_out_degree = calculate_gini_coefficients(metrics.out_degrees.values())
     data.append(("Degree of connectivity (dependencies)", gini_out_degree))
 
     # Prestige (PageRank)
-    pagerank = nx.pagerank(graph)
-    gini_pagerank = calculate_gini_coefficients([v for v in pagerank.values()])
+    pagerank = metrics.pagerank
+    gini_pagerank = calculate_gini_coefficients(pagerank.values())
     data.append(("Prestige (PageRank)", gini_pagerank))
 
     id = "gini_coefficients"
     caption = "Gini coefficients"
 
-    output: list[str] = []
-
-    output.append(f"\n<!-- BEGIN {id} -->")
-    output.append(f"table: {caption} {{#tbl:{id}}}\n")
-    output.append("| Measure | Gini coefficient |")
-    # output.append(f"|{FULL_WIDTH_HEADER_SEPARATOR}|------:|")
-    output.append("|------|------:|")
-    for i, (pkg, score) in enumerate(data, 1):
-        output.append(f"| {pkg} | {score:.4f} |")
-    output.append(f"\n<!-- END {id} -->")
-
-    return "\n".join(output)
+    rows = "".join(f"\n| {pkg} | {score:.4f} |" for pkg, score in data)
+    return (
+        f"\n<!-- BEGIN {id} -->\n"
+        f"table: {caption} {{#tbl:{id}}}\n\n"
+        "| Measure | Gini coefficient |\n"
+        # f"|{FULL_WIDTH_HEADER_SEPARATOR}|------:|"
+        "|------|------:|"
+        f"{rows}\n"
+        f"\n<!-- END {id} -->"
+    )
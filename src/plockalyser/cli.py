@@ -7,6 +7,7 @@ import argparse
 from pydantic import BaseModel
 
 from plockalyser.analyses import (
+    GraphMetrics,
     analyse_centrality,
     analyse_connectivity,
     get_summary_statistics,
@@ -120,11 +121,14 @@ def main():
 
     # Run analyses
     if args.tables:
+        metrics = GraphMetrics.from_graph(graph)
         tables_output: list[str] = []
-        tables_output.append(format_summary_statistics(get_summary_statistics(graph)))
-        tables_output.append(analyse_connectivity(graph))
-        tables_output.append(analyse_centrality(graph))
-        tables_output.append(format_gini(graph))
+        tables_output.append(
+            format_summary_statistics(get_summary_statistics(graph, metrics))
+        )
+        tables_output.append(analyse_connectivity(graph, metrics))
+        tables_output.append(analyse_centrality(graph, metrics))
+        tables_output.append(format_gini(graph, metrics))
         output_tables(tables_output, args.output)
 
 
@@ -1,18 +1,35 @@
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 import networkx as nx
 
 NODE_COLOR = "#b8d5b8"
 ROOT_COLOR = "#ce6c47"
 
+COLOR_BY_TYPE = {"root": ROOT_COLOR, "dependency": NODE_COLOR}
+EDGE_STYLE_BY_TYPE = {"installed": "solid", "required": "dashed"}
+
+NODE_TEMPLATE = '  "{node}" [label="{label}", fillcolor="{color}"];'
+ROOT_NODE_TEMPLATE = '  "{node}" [label="{label}", fillcolor="{color}", style="filled, bold", fontsize=14, padding=4, width=1.5, height=6, penwidth=2];'
+
 # TODO:
 # - Colour the nodes based on out-degree
 # - Perhaps colour based on the different analyses?
 
 
-def generate_dot_data(graph: nx.DiGraph) -> list[str]:
+def _node_label(node: str, data: dict) -> str:
+    """Create a label with package name and version."""
+    node_name = data["name"] if "name" in data else node.split("@", 1)[0]
+    if "version" in data:
+        return f"{node_name}\\n{data['version']}"
+    if "version_constraint" in data:
+        return f"{node_name}\\n{data['version_constraint']}"
+    return node_name
+
+
+def iter_dot_lines(graph: nx.DiGraph) -> Iterator[str]:
     """
-    Generate DOT data for the given dependency graph.
+    Generate DOT data for the given dependency graph, one line at a time.
 
     Args:
         graph: The dependency graph to export.
@@ -20,9 +37,7 @@ def generate_dot_data(graph: nx.DiGraph) -> list[str]:
     graph_to_export = graph
 
     # Start the DOT file
-    dot_data = [
-        "digraph DependencyNetwork {",
-    ]
+    yield "digraph DependencyNetwork {"
 
     graph_settings = [
         "  graph [",
@@ -59,62 +74,47 @@ def generate_dot_data(graph: nx.DiGraph) -> list[str]:
     ]
 
     # Add all settings to the DOT data
-    dot_data.extend(graph_settings)
-    dot_data.extend(node_settings)
-    dot_data.extend(edge_settings)
-    dot_data.extend(edge_handling)
+    for settings in (graph_settings, node_settings, edge_settings, edge_handling):
+        yield from settings
+
+    # Escape quotes in node names for DOT format, once per node
+    safe_names = {
+        node: node.replace('"', '\\"') if '"' in node else node
+        for node in graph_to_export.nodes()
+    }
+
+    # Gather the node attributes into parallel lists up front, so that the loop
+    # below only has to fill in the templates.
+    nodes = list(graph_to_export.nodes(data=True))
+    node_types = [data.get("type", "unknown") for _, data in nodes]
+    # Set color based on node type
+    colors = [COLOR_BY_TYPE.get(node_type, "white") for node_type in node_types]
+    labels = [_node_label(node, data) for node, data in nodes]
 
     # Add nodes with attributes
-    for node, data in graph_to_export.nodes(data=True):
-        node_name = data.get("name", node.split("@")[0])
-        node_type = data.get("type", "unknown")
-
-        # Set color based on node type
-        if node_type == "root":
-            color = ROOT_COLOR
-        elif node_type == "dependency":
-            color = NODE_COLOR
-        else:
-            color = "white"
-
-        # Create a label with package name and version
-        if "version" in data:
-            label = f"{node_name}\\n{data['version']}"
-        elif "version_constraint" in data:
-            label = f"{node_name}\\n{data['version_constraint']}"
-        else:
-            label = node_name
-
-        # Escape quotes in node names for DOT format
-        safe_node = node.replace('"', '\\"')
-
-        if node_type == "root":
-            dot_data.append(
-                f'  "{safe_node}" [label="{label}", fillcolor="{color}", style="filled, bold", fontsize=14, padding=4, width=1.5, height=6, penwidth=2];'
-            )
-        else:
-            dot_data.append(f'  "{safe_node}" [label="{label}", fillcolor="{color}"];')
-
-    # Add edges with attributes
+    for (node, _), node_type, label, color in zip(nodes, node_types, labels, colors):
+        template = ROOT_NODE_TEMPLATE if node_type == "root" else NODE_TEMPLATE
+        yield template.format(node=safe_names[node], label=label, color=color)
+
+    # Add edges with attributes, styled based on type
     for source, target, data in graph_to_export.edges(data=True):
-        edge_type = data.get("type", "unknown")
+        style = EDGE_STYLE_BY_TYPE.get(data.get("type"), "dotted")
+        yield f'  "{safe_names[source]}" -> "{safe_names[target]}" [style={style}];'
 
-        # Set edge style based on type
-        if edge_type == "installed":
-            style = "solid"
-        elif edge_type == "required":
-            style = "dashed"
-        else:
-            style = "dotted"
+    yield "}"
 
-        # Escape quotes in node names for DOT format
-        safe_source = source.replace('"', '\\"')
-        safe_target = target.replace('"', '\\"')
 
-        dot_data.append(f'  "{safe_source}" -> "{safe_target}" [style={style}];')
+def generate_dot_data(graph: nx.DiGraph) -> list[str]:
+    """
+    Generate DOT data for the given dependency graph.
 
-    dot_data.append("}")
-    return dot_data
+    Args:
+        graph: The dependency graph to export.
+
+    Returns:
+        The lines of the DOT file.
+    """
+    return list(iter_dot_lines(graph))
 
 
 def export_to_dot(graph: nx.DiGraph, output_file: Optional[Path]):
@@ -125,12 +125,11 @@ def export_to_dot(graph: nx.DiGraph, output_file: Optional[Path]):
         graph: The dependency graph to export.
         output_file: The path to the output DOT file.
     """
-    dot_data = "\n".join(generate_dot_data(graph))
     if not output_file:
-        print(dot_data)
+        sys.stdout.writelines(line + "\n" for line in iter_dot_lines(graph))
         return
 
-    # Write to file
+    # Stream to file rather than building the whole document in memory
     with open(output_file, "w") as f:
-        f.write(dot_data)
+        f.writelines(line + "\n" for line in iter_dot_lines(graph))
         print(f"DOT file exported to {output_file}")
@@ -11,19 +11,17 @@ def generate_markdown_table(
     short_caption: Optional[str] = None,
 ) -> str:
     """Generate a Markdown table for a given centrality metric."""
-    output: list[str] = []
-
-    output.append(f"\n<!-- BEGIN {id} -->")
-    output.append(
-        f"table: {caption} {{#tbl:{id}{(' shortcaption="' + short_caption + '"') if short_caption else ''}}}\n"
+    rows = "".join(
+        f"\n| {MARGIN_MARKERS.get(i, '')}`{pkg}` | {score:.4f} |"
+        for i, (pkg, score) in enumerate(data, 1)
+    )
+    return (
+        f"\n<!-- BEGIN {id} -->\n"
+        f"table: {caption} {{#tbl:{id}{(' shortcaption="' + short_caption + '"') if short_caption else ''}}}\n\n"
+        "| Package | Score |\n"
+        f"|{FULL_WIDTH_HEADER_SEPARATOR}|------:|{rows}\n"
+        f"\n<!-- END {id} -->"
     )
-    output.append("| Package | Score |")
-    output.append(f"|{FULL_WIDTH_HEADER_SEPARATOR}|------:|")
-    for i, (pkg, score) in enumerate(data, 1):
-        output.append(f"| {table_margin_marker(i)}`{pkg}` | {score:.4f} |")
-    output.append(f"\n<!-- END {id} -->")
-
-    return "\n".join(output)
 
 
 @contextmanager
@@ -38,5 +36,16 @@ def surround_with_marker(marker: str):
 FULL_WIDTH_HEADER_SEPARATOR = "-" * 80
 
 
+def _format_margin_marker(marker: int) -> str:
+    return f"\\marginnote{{\\scriptsize{{  {marker} }}}}"
+
+
+# Margin markers for every fifth row, precomputed so that the row loops only need a
+# dict lookup. The tables are far shorter than this.
+MARGIN_MARKERS = {i: _format_margin_marker(i) for i in range(5, 1000, 5)}
+
+
 def table_margin_marker(marker: int):
-    return f"\\marginnote{{\\scriptsize{{  {marker} }}}}" if marker % 5 == 0 else ""
+    if marker in MARGIN_MARKERS:
+        return MARGIN_MARKERS[marker]
+    return _format_margin_marker(marker) if marker % 5 == 0 else ""